@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2024  darryl mcculley
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" reproducible benchmarks for the core `delta` operations.
+
+    >>> python -m benchmarks.benchmark --scale 10k 1m --schema narrow wide --output results.json
+    >>> python -m benchmarks.benchmark --scale 10k --compare results.json
+"""
+
+from argparse import ArgumentParser
+from json import dump, load
+from platform import platform, python_version
+from shutil import rmtree
+from os.path import join
+from statistics import mean, median
+from tempfile import mkdtemp
+from time import perf_counter
+from datetime import datetime, timezone
+from typing import Callable
+
+from polars import DataFrame, select, int_range, col, lit, concat_str, __version__ as polars_version
+from deltalake import __version__ as deltalake_version
+
+from deltabase import delta
+
+SCALES:dict[str, int] = {
+    "10k": 10_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+    "100m": 100_000_000,
+}
+
+SCHEMAS:dict[str, int] = {
+    "narrow": 4,
+    "wide": 100,
+}
+
+BATCHES = 4
+TABLES = 32
+
+def generate(rows:int, schema:str="narrow", offset:int=0) -> DataFrame:
+    """ generates a deterministic synthetic table with an `id` primary key.
+
+        **args**:
+        - **rows**: the number of rows to generate.
+        - **schema**: `optional` one of `SCHEMAS`, controls the number of `field_<n>` columns. default is `'narrow'`.
+        - **offset**: `optional` the first `id` value, used to generate overlapping batches. default is `0`.
+
+        >>> generate(10_000, schema="wide")
+    """
+    return select(int_range(offset, offset + rows).alias("id")).with_columns(
+        concat_str(lit("name_"), col("id")).alias("name"),
+        (col("id") % 16).alias("group"),
+        *[(col("id") + n).alias(f"field_{n}") for n in range(SCHEMAS[schema])],
+    )
+
+def reset(db:delta):
+    """ unregisters every table, the sql context is shared between `delta` instances. """
+    for table in db.tables:
+        db._delta__delta_sql_context.unregister(table)
+
+def case_upsert(path:str, rows:int, schema:str) -> Callable:
+    batch = max(rows // BATCHES, 1)
+    batches = [generate(batch, schema, offset=n * batch // 2) for n in range(BATCHES)]
+    db = delta.connect(path=path)
+    def run():
+        for data in batches: db.upsert(table="bench", primary_key="id", data=data)
+        db.sql("select * from bench", dtype="polars")
+    return run
+
+def case_upsert_records(path:str, rows:int, schema:str) -> Callable:
+    data = generate(rows, schema).to_dicts()
+    db = delta.connect(path=path)
+    def run():
+        db.upsert(table="bench", primary_key="id", data=data)
+        db.sql("select * from bench", dtype="polars")
+    return run
+
+def case_upsert_arrow(path:str, rows:int, schema:str) -> Callable:
+    data = generate(rows, schema).to_arrow()
+    db = delta.connect(path=path)
+    def run():
+        db.upsert(table="bench", primary_key="id", data=data)
+        db.sql("select * from bench", dtype="polars")
+    return run
+
+def case_upsert_parquet(path:str, rows:int, schema:str) -> Callable:
+    data = join(path, "batch.parquet")
+    generate(rows, schema).write_parquet(data)
+    db = delta.connect(path=path)
+    def run():
+        db.upsert(table="bench", primary_key="id", data=data)
+        db.sql("select * from bench", dtype="polars")
+    return run
+
+def case_commit(path:str, rows:int, schema:str) -> Callable:
+    db = delta.connect(path=path)
+    db.upsert(table="bench", primary_key="id", data=generate(rows, schema))
+    return lambda: db.commit("bench")
+
+def case_connect(path:str, rows:int, schema:str) -> Callable:
+    db = delta.connect(path=path)
+    data = generate(max(rows // TABLES, 1), schema)
+    for n in range(TABLES):
+        db.register(table=f"bench_{n}", data=data)
+        db.commit(f"bench_{n}")
+    reset(db)
+    return lambda: delta.connect(path=path)
+
+def case_delete_sql(path:str, rows:int, schema:str) -> Callable:
+    db = delta.connect(path=path)
+    db.upsert(table="bench", primary_key="id", data=generate(rows, schema))
+    def run():
+        db.delete(table="bench", filter="field_0 % 2 = 0")
+        db.sql("select * from bench", dtype="polars")
+    return run
+
+def case_delete_lambda(path:str, rows:int, schema:str) -> Callable:
+    db = delta.connect(path=path)
+    db.upsert(table="bench", primary_key="id", data=generate(rows, schema))
+    def run():
+        db.delete(table="bench", filter=lambda row: row["field_0"] % 2 == 0)
+        db.sql("select * from bench", dtype="polars")
+    return run
+
+def case_sql_polars(path:str, rows:int, schema:str) -> Callable:
+    db = delta.connect(path=path)
+    db.upsert(table="bench", primary_key="id", data=generate(rows, schema))
+    db.commit("bench")
+    reset(db)
+    db = delta.connect(path=path)
+    return lambda: db.sql("select * from bench", dtype="polars")
+
+def case_sql_json(path:str, rows:int, schema:str) -> Callable:
+    db = delta.connect(path=path)
+    db.upsert(table="bench", primary_key="id", data=generate(rows, schema))
+    db.commit("bench")
+    reset(db)
+    db = delta.connect(path=path)
+    return lambda: db.sql("select * from bench", dtype="json")
+
+CASES:dict[str, Callable] = {
+    "upsert": case_upsert,
+    "upsert_records": case_upsert_records,
+    "upsert_arrow": case_upsert_arrow,
+    "upsert_parquet": case_upsert_parquet,
+    "commit": case_commit,
+    "connect": case_connect,
+    "delete_sql": case_delete_sql,
+    "delete_lambda": case_delete_lambda,
+    "sql_polars": case_sql_polars,
+    "sql_json": case_sql_json,
+}
+
+def measure(case:str, scale:str, schema:str, repeat:int=3) -> dict:
+    """ runs a single benchmark case, each repeat is timed against a freshly prepared delta source.
+
+        **args**:
+        - **case**: one of `CASES`.
+        - **scale**: one of `SCALES`.
+        - **schema**: one of `SCHEMAS`.
+        - **repeat**: `optional` the number of timed runs. default is `3`.
+
+        returns a dictionary with the timings in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        path = mkdtemp(prefix="deltabase-bench-")
+        try:
+            run = CASES[case](path, SCALES[scale], schema)
+            start = perf_counter()
+            run()
+            times.append(perf_counter() - start)
+        finally:
+            reset(delta())
+            rmtree(path, ignore_errors=True)
+
+    return dict(
+        case=case, scale=scale, schema=schema,
+        rows=SCALES[scale], columns=SCHEMAS[schema] + 3,
+        repeat=repeat, times=times,
+        min=min(times), median=median(times), mean=mean(times),
+    )
+
+def compare(results:list[dict], baseline:list[dict]):
+    """ prints the median ratio of each result against a matching baseline result. """
+    key = lambda r: (r["case"], r["scale"], r["schema"])
+    previous = {key(r): r for r in baseline}
+    for result in results:
+        match = previous.get(key(result))
+        if match is None: continue
+        ratio = result["median"] / match["median"] if match["median"] else float("inf")
+        print(f"{result['case']:<16}{result['scale']:<8}{result['schema']:<8}{match['median']:>10.4f}s {result['median']:>10.4f}s {ratio:>8.2f}x")
+
+def main():
+    parser = ArgumentParser(description="deltabase benchmarks")
+    parser.add_argument("--scale", nargs="+", default=["10k"], choices=SCALES)
+    parser.add_argument("--schema", nargs="+", default=list(SCHEMAS), choices=SCHEMAS)
+    parser.add_argument("--case", nargs="+", default=list(CASES), choices=CASES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write results to a json file.")
+    parser.add_argument("--compare", help="compare results against a previous json output.")
+    args = parser.parse_args()
+
+    results = []
+    for scale in args.scale:
+        for schema in args.schema:
+            for case in args.case:
+                result = measure(case, scale, schema, args.repeat)
+                print(f"{case:<16}{scale:<8}{schema:<8}{result['median']:>10.4f}s")
+                results.append(result)
+
+    report = dict(
+        meta=dict(
+            timestamp=datetime.now(timezone.utc).isoformat(),
+            python=python_version(),
+            platform=platform(),
+            polars=polars_version,
+            deltalake=deltalake_version,
+        ),
+        results=results,
+    )
+
+    if args.output:
+        with open(args.output, "w") as f: dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f: compare(results, load(f)["results"])
+
+if __name__ == "__main__":
+    main()
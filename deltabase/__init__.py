@@ -17,17 +17,30 @@
 #     along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 from types import LambdaType
-from typing import Any, TypeVar, Type
+from typing import Any, Callable, Iterator, TypeVar, Type
 
 from .plugins import delta_plugin
-
-from polars import SQLContext, DataFrame, LazyFrame, Schema, sql_expr, scan_delta, struct, coalesce, from_dicts, from_dict, from_pandas
-from polars.exceptions import SchemaError
-
-from deltalake import WriterProperties
+from .instrument import delta_metrics, instrument, record, increment, active, plan_depth
+from .explain import identifiers, projected_columns, estimate_bytes
+from .pushdown import predicate, tables_and_aliases
+from .changes import net_changes, CDF_COLUMNS
+from .snapshot import delta_snapshot, snapshot_cache, resolve_version, committed
+from .ingest import to_lazyframe
+from .views import delta_view, plan_view, counted, merge_aggregates, merge_rows, HIDDEN_COUNT
+
+from polars import SQLContext, DataFrame, LazyFrame, Schema, sql_expr, scan_pyarrow_dataset, scan_ipc, struct, coalesce, concat, any_horizontal, from_pandas, from_arrow, col
+from polars.exceptions import SchemaError, ComputeError, PolarsError
+
+from deltalake import DeltaTable, WriterProperties
+from pyarrow import Table, RecordBatch, RecordBatchReader, ArrowException
+from pyarrow.dataset import FileSystemDataset
 from datetime import datetime
 from os.path import exists, isdir, join
-from os import listdir
+from os import listdir, makedirs, remove
+from tempfile import mkdtemp
+from shutil import rmtree
+from atexit import register as on_exit
+from uuid import uuid4
 
 from deltalake.exceptions import TableNotFoundError
 
@@ -35,17 +48,35 @@ from logging import getLogger
 
 debugger = getLogger("deltabase")
 
+try: from .server import delta_server, delta_client
+except ImportError:
+    delta_server = delta_client = None
+    debugger.info("unable to load query server. unix sockets are not supported on this platform.")
+
 T = TypeVar("T", bound="delta")
 
 class delta_config:
     dtype:str="json" 
     writer_properties:WriterProperties = WriterProperties()
     ai_model:str="gpt-4o-mini"
+    instrument:Callable[[delta_metrics], Any]=None
+    profile:bool=False
+    memory_budget:int=None
+    spill_path:str=None
+    snapshot_cache_size:int=16
+    snapshot_materialize_rows:int=0
 
 class delta:
     __delta_source:str
     __delta_sql_context:SQLContext=SQLContext(frames=[])
     __delta_sql_context_schema:dict[str, Schema]={}
+    __delta_sql_context_source:dict[str, tuple[DeltaTable, FileSystemDataset, LazyFrame]]={}
+    __delta_sql_context_memory:dict[str, int]={}
+    __delta_sql_context_spill:dict[str, str]={}
+    __delta_spill_path:str=None
+    __delta_snapshots:snapshot_cache=snapshot_cache()
+    __delta_views:dict[str, delta_view]={}
+    __delta_primary_keys:dict[str, str]={}
     config:delta_config
 
     def __getattr__(self, name):
@@ -63,7 +94,24 @@ class delta:
         """
         return self.__delta_sql_context.tables()
 
+    @property
+    def memory(self) -> dict[str, int|None]:
+        """ resident memory of each table within the sql context in bytes.
+
+            tables scanned from the delta source and staged tables spilled to disk report `0`, materialized snapshots report their size. staged tables are only measured when `delta_config.memory_budget` is set, otherwise they report `None`.
+
+            >>> db.memory  # output: {"table_1": 0, "table_2": 1048576}
+        """
+        memory = {}
+        for table in self.tables:
+            if table in self.__delta_sql_context_source:
+                data = self.__delta_sql_context_source[table][2]
+                memory[table] = data.estimated_size() if isinstance(data, DataFrame) else 0
+            else: memory[table] = self.__delta_sql_context_memory.get(table)
+        return memory
+
     @classmethod
+    @instrument
     def connect(cls: Type[T], path:str, config:delta_config=delta_config(), scan_local_dir:bool=True) -> T:
         """ connects to a remote source if provided, or local path, sets config, and automatically scans for tables.
 
@@ -98,6 +146,7 @@ class delta:
 
         return delta_cls
 
+    @instrument
     def register(self, 
         table:str, 
         pyarrow_options:dict=None, 
@@ -123,21 +172,184 @@ class delta:
             >>>     "partitions": [("year", "=", "2021")]
             >>> })
         """
-        table_path = join(self.__delta_source, database, table)
+        err = self.__register(table, pyarrow_options=pyarrow_options, alias=alias, database=database, version=version, data=data)
+        return err or self.__refresh_views(alias if alias else table)
 
-        options = dict()
-        if pyarrow_options: options["pyarrow_options"] = pyarrow_options
-        if isinstance(version, int|str|datetime): options["version"] = version
+    def __register(self, 
+        table:str, 
+        pyarrow_options:dict=None, 
+        alias:str=None,
+        database:str="default",
+        version:int|str|datetime=None,
+        data:DataFrame|LazyFrame=None,
+    ) -> Exception:
+        """ registers a table in the sql context, without refreshing the materialized views that read it. """
+        table_path = join(self.__delta_source, database, table)
         table_name = alias if alias else table
 
         try:
-            if data is None: data = scan_delta(table_path, **options)
+            if data is None:
+                delta_table = self.__load(table_path, version=version)
+                dataset = self.__dataset(delta_table, pyarrow_options=pyarrow_options)
+                data = scan_pyarrow_dataset(dataset)
+                if version is not None and not pyarrow_options: data = self.__materialize(table_path, delta_table, data)
+                source = (delta_table, dataset, data)
             elif not isinstance(data, (DataFrame, LazyFrame)): 
                 raise TypeError(f"deltabase.register:: provided {type(data)} is not {DataFrame} or {LazyFrame}")
+            else: source = None
+            if source: self.__release(table_name)
+            elif self.config.memory_budget is not None: data = self.__stage(table_name, data)
+            if active(): record(plan_depth=plan_depth(data.lazy()))
             self.__delta_sql_context.register(table_name, data)
             self.__delta_sql_context_schema[table_name] = data.collect_schema()
+            if source: self.__delta_sql_context_source[table_name] = source
+            else: self.__delta_sql_context_source.pop(table_name, None)
         except (TableNotFoundError, FileNotFoundError) as e: return e
     
+    def __stage(self, table:str, data:DataFrame|LazyFrame) -> DataFrame|LazyFrame:
+        """ materializes a staged table, then spills the least recently staged tables to disk until the memory budget is met. spilled tables are memory-mapped back from arrow ipc files when used.
+
+            **args**:
+            - **table**: the name of the staged table.
+            - **data**: the staged data.
+
+            returns the data to register for the staged table.
+        """
+        data = data.lazy().collect()
+        for name in [table, *set(self.__delta_sql_context_memory) - set(self.tables)]: self.__release(name)
+        self.__delta_sql_context_memory[table] = data.estimated_size()
+
+        for name in list(self.__delta_sql_context_memory):
+            if sum(self.__delta_sql_context_memory.values()) <= self.config.memory_budget: break
+            if not self.__delta_sql_context_memory[name]: continue
+
+            frame = data if name == table else self.__delta_sql_context.execute(f"select * from {name}").collect()
+            path = join(self.__spill_directory(), f"{name}-{uuid4().hex}.arrow")
+            frame.write_ipc(path)
+            increment(bytes_written=self.__delta_sql_context_memory[name])
+
+            spilled = scan_ipc(path, memory_map=True)
+            if name == table: data = spilled
+            else: self.__delta_sql_context.register(name, spilled)
+            self.__delta_sql_context_memory[name] = 0
+            self.__delta_sql_context_spill[name] = path
+
+        return data
+
+    def __release(self, table:str):
+        """ forgets the resident memory of a staged table and removes its spill file. """
+        self.__delta_sql_context_memory.pop(table, None)
+        path = self.__delta_sql_context_spill.pop(table, None)
+        if path and exists(path):
+            try: remove(path)
+            except OSError as e: debugger.warning(f"unable to remove spill file `{path}`: {e}")
+
+    def __spill_directory(self) -> str:
+        """ returns the directory for spill files, a temporary directory removed on exit unless `delta_config.spill_path` is set. """
+        if self.config.spill_path:
+            makedirs(self.config.spill_path, exist_ok=True)
+            return self.config.spill_path
+        if delta.__delta_spill_path is None:
+            delta.__delta_spill_path = mkdtemp(prefix="deltabase-")
+            on_exit(rmtree, delta.__delta_spill_path, ignore_errors=True)
+        return delta.__delta_spill_path
+
+    def __load(self, table_path:str, version:int|str|datetime=None) -> DeltaTable:
+        """ loads the delta log of a table from the delta source. explicit versions are resolved to a version number, with timestamps found by a binary search over the log, and kept in the snapshot cache.
+
+            **args**:
+            - **table_path**: the path of the table within the delta source.
+            - **version**: `optional` the version of the table to load, can be an integer, string, or datetime.
+        """
+        if version is None: return DeltaTable(table_path)
+
+        resolved = version if isinstance(version, int) else resolve_version(table_path, version)
+        if resolved is None:
+            delta_table = DeltaTable(table_path)
+            delta_table.load_as_version(version)
+            resolved = delta_table.version()
+        else: delta_table = None
+
+        commit_time = committed(table_path, resolved)
+        snapshot = self.__delta_snapshots.get(table_path, resolved)
+        if snapshot is None or snapshot.committed != commit_time:
+            snapshot = delta_snapshot(delta_table or DeltaTable(table_path, version=resolved), committed=commit_time)
+            self.__delta_snapshots.put(table_path, resolved, snapshot, size=self.config.snapshot_cache_size)
+        return snapshot.delta_table
+
+    def __materialize(self, table_path:str, delta_table:DeltaTable, data:LazyFrame) -> DataFrame|LazyFrame:
+        """ returns the cached data of a snapshot when it has at most `delta_config.snapshot_materialize_rows` rows, collecting it on first use. snapshots without record counts in the delta log are not materialized.
+
+            **args**:
+            - **table_path**: the path of the table within the delta source.
+            - **delta_table**: the loaded snapshot.
+            - **data**: a lazyframe scanning the snapshot.
+        """
+        if self.config.snapshot_materialize_rows <= 0: return data
+        snapshot = self.__delta_snapshots.get(table_path, delta_table.version())
+        if snapshot is None: return data
+        rows = snapshot.rows
+        if rows is None or rows > self.config.snapshot_materialize_rows: return data
+        if snapshot.data is None: snapshot.data = data.collect()
+        return snapshot.data
+
+    def __dataset(self, delta_table:DeltaTable, pyarrow_options:dict=None) -> FileSystemDataset:
+        """ returns the pyarrow dataset of the files in a loaded delta table.
+
+            **args**:
+            - **delta_table**: the delta table to scan.
+            - **pyarrow_options**: `optional` options for loading the table using pyarrow.
+        """
+        dataset = delta_table.to_pyarrow_dataset(**(pyarrow_options or {}))
+        if active():
+            actions = delta_table.get_add_actions().to_pydict()
+            sizes = dict(zip(actions["path"], actions["size_bytes"]))
+            paths = [fragment.path for fragment in dataset.get_fragments()]
+            increment(files_touched=len(paths), bytes_read=sum(sizes.get(path, 0) for path in paths))
+
+        return dataset
+
+    def __prune(self, query:str, table:str) -> FileSystemDataset|None:
+        """ returns a dataset of only the delta files of a table that can match the where clause of a sql query, using partition values and log stats.
+
+            **args**:
+            - **query**: the sql query.
+            - **table**: the name of a table in the sql context loaded from the delta source.
+
+            returns none when no files can be skipped.
+        """
+        _, dataset, _ = self.__delta_sql_context_source[table]
+        expression = predicate(query, table, self.__delta_sql_context_schema)
+        if expression is None: return None
+
+        try: fragments = list(dataset.get_fragments(filter=expression))
+        except ArrowException as e:
+            debugger.debug(f"unable to prune `{table}`: {e}")
+            return None
+        if len(fragments) == len(dataset.files): return None
+        return FileSystemDataset(fragments, dataset.schema, dataset.format, dataset.filesystem)
+
+    def __execute(self, query:str) -> LazyFrame:
+        """ executes a sql query within the sql context, scanning only the delta files that can match its where clause.
+
+            **args**:
+            - **query**: the sql query to execute.
+        """
+        names = identifiers(query)
+        pruned = {}
+        for table in self.__delta_sql_context_source:
+            if table not in names or isinstance(self.__delta_sql_context_source[table][2], DataFrame): continue
+            dataset = self.__prune(query, table)
+            if dataset is not None: pruned[table] = dataset
+
+        if not pruned: return self.__delta_sql_context.execute(query)
+
+        try:
+            for table, dataset in pruned.items(): self.__delta_sql_context.register(table, scan_pyarrow_dataset(dataset))
+            return self.__delta_sql_context.execute(query)
+        finally:
+            for table in pruned: self.__delta_sql_context.register(table, self.__delta_sql_context_source[table][2])
+
     def __sync_data(self, primary_key:str, target_data:LazyFrame, source_data:LazyFrame) -> LazyFrame:
         """ performs a full outer join on the primary key and coalesces data to ensure consistency.
             
@@ -169,10 +381,46 @@ class delta:
         
         return update_data
 
+    def __sync_changes(self, primary_key:str, data:LazyFrame, staged_data:LazyFrame, committed_data:LazyFrame=None) -> tuple[DataFrame, DataFrame, DataFrame]:
+        """ upserts data into a staged table like `__sync_data`, for tables read by materialized views. only the rows that can change are joined, the rest of the staged table is kept as is.
+
+            the rows that can change are the upserted keys, and the keys that take values from the committed table: committed keys missing from the staged table, and staged rows with nulls.
+
+            **args**:
+            - **primary_key**: the primary key on which the join will be performed.
+            - **data**: the data to upsert.
+            - **staged_data**: the staged table.
+            - **committed_data**: `optional` the committed table, when it exists.
+
+            returns the updated table, and the new and previous values of the changed rows.
+        """
+        staged_data = staged_data.collect()
+        filled = []
+        if committed_data is not None:
+            columns = committed_data.collect_schema().names()
+            shared = [column for column in columns if column != primary_key and column in staged_data.columns]
+            committed_keys = committed_data.select(primary_key).collect()
+            filled.append(committed_keys.filter(~col(primary_key).is_in(staged_data[primary_key])))
+            if not set(columns) <= set(staged_data.columns): filled.append(staged_data.select(primary_key))
+            elif any(staged_data[column].null_count() for column in shared): filled.append(staged_data.filter(any_horizontal(col(shared).is_null())).select(primary_key))
+
+        # pyarrow scans can not push down chunked `is_in` values
+        keys = concat([data.select(primary_key).collect(), *filled], how="vertical_relaxed")[primary_key].rechunk()
+        filled = concat(filled, how="vertical_relaxed")[primary_key].rechunk() if filled else []
+
+        removed = staged_data.filter(col(primary_key).is_in(keys))
+        source_data = removed.lazy()
+        if len(filled): source_data = self.__sync_data(primary_key, source_data, committed_data.filter(col(primary_key).is_in(filled)))
+        added = self.__sync_data(primary_key, data, source_data).collect()
+
+        update_data = concat([staged_data.filter(~col(primary_key).is_in(keys)), added], how="diagonal_relaxed").select(added.columns)
+        return update_data, added, removed
+
+    @instrument
     def upsert(self, 
         table:str,
         primary_key:str,
-        data:list[dict] | dict | DataFrame | LazyFrame,
+        data:list[dict] | dict | DataFrame | LazyFrame | Table | RecordBatch | RecordBatchReader | Iterator[RecordBatch] | str,
         database:str="default",
     ) -> Exception:
         """ updates or inserts records in the specified table, with schema changes handled automatically. changes are reflected in the sql context, but a commit is required to persist them.
@@ -180,33 +428,40 @@ class delta:
             **args**:
             - **table**: the name of the table to upsert data into.
             - **primary_key**: the primary key used to match records for updates.
-            - **data**: the data to be upserted, can be a list of dictionaries, a dictionary, `DataFrame`, or `LazyFrame`.
+            - **data**: the data to be upserted, can be a list of dictionaries, a record or column-oriented dictionary, `DataFrame`, `LazyFrame`, pyarrow `Table`, `RecordBatch`, `RecordBatchReader` or iterator of record batches, or the path of a parquet or ndjson file.
             - **database**: `optional` the name of the database where the table is located. default is `'default'`.   
 
+            dictionaries are converted using the schema of the registered table, so column types are not inferred again on every call.
+
             >>> db.upsert(database="mydatabase", table="mytable", primary_key="id", data=...)
+            >>> db.upsert(database="mydatabase", table="mytable", primary_key="id", data={"id": [1, 2], "name": ["alice", "bob"]})
+            >>> db.upsert(database="mydatabase", table="mytable", primary_key="id", data="batch.parquet")
         """
-        if isinstance(data, list) and len(data) > 0 and isinstance(data[0], dict): data = from_dicts(data).lazy()
-        elif isinstance(data, dict): data = from_dict(data).lazy()
-        elif isinstance(data, DataFrame): data = data.lazy()
-        elif isinstance(data, LazyFrame): pass
-        else: return ValueError(f"'data' was provided as '{type(data)}', type must be 'list[dict]' | 'dict' | 'DataFrame' | 'LazyFrame'")
+        try: data = to_lazyframe(data, schema=self.__delta_sql_context_schema.get(table) if table in self.tables else None)
+        except ValueError as e: return e
 
         if table not in self.tables:
-            return self.register(database=database, table=table, data=data)
+            err = self.__register(database=database, table=table, data=data)
+            self.__delta_primary_keys[table] = primary_key
+            return err or self.__refresh_views(table)
 
         table_path = join(self.__delta_source, database, table)
         
-        try: 
-            source_data = scan_delta(table_path)
-            staged_data = self.sql(f"select * from {table}", lazy=True)
-            source_data = self.__sync_data(primary_key, staged_data, source_data)
-        except (TableNotFoundError, FileNotFoundError) as e:
-            source_data = self.sql(f"select * from {table}", lazy=True)
-
-        update_data = self.__sync_data(primary_key, data, source_data)
+        staged_data = self.sql(f"select * from {table}", lazy=True)
+        try: committed_data = scan_pyarrow_dataset(self.__dataset(self.__load(table_path)))
+        except (TableNotFoundError, FileNotFoundError) as e: committed_data = None
+
+        added = removed = None
+        if self.__views(table): update_data, added, removed = self.__sync_changes(primary_key, data, staged_data, committed_data)
+        else:
+            source_data = staged_data if committed_data is None else self.__sync_data(primary_key, staged_data, committed_data)
+            update_data = self.__sync_data(primary_key, data, source_data)
         
-        return self.register(database=database, table=table, data=update_data)
+        err = self.__register(database=database, table=table, data=update_data)
+        self.__delta_primary_keys[table] = primary_key
+        return err or self.__maintain_views(table, added=added, removed=removed)
     
+    @instrument
     def delete(self, table:str, filter:str|LambdaType="*", database:str="default") -> Exception:
         """ removes records using a specified sql condition or lambda function. this only affects the sql context and does not delete data from disk or cloud storage.
 
@@ -225,17 +480,19 @@ class delta:
             return None
         elif isinstance(filter, str):
             source_data = self.sql(f"select * from {table}", lazy=True)
-            filter_data = source_data.filter(~sql_expr(filter))
+            condition = sql_expr(filter)
         elif type(filter) == LambdaType:
             source_data = self.sql(f"select * from {table}", lazy=True)
-            filter_data = source_data.filter(
-                ~struct(source_data.collect_schema().names()).map_elements(filter, return_dtype=bool)
-            )
+            condition = struct(source_data.collect_schema().names()).map_elements(filter, return_dtype=bool)
         else: 
             return ValueError(f"'filter' was provided as '{type(filter)}', type must be 'callable' or 'str'")
 
-        return self.register(database=database, table=table, data=filter_data)
+        removed = source_data.filter(condition).collect() if self.__views(table) else None
 
+        err = self.__register(database=database, table=table, data=source_data.filter(~condition))
+        return err or self.__maintain_views(table, added=removed.clear() if removed is not None else None, removed=removed)
+
+    @instrument
     def sql(self, query:str, lazy:bool=False, dtype:str=None) -> DataFrame | LazyFrame:
         """ executes the provided sql query and returns the result as a dataframe or lazyframe. the result type can be specified via the dtype argument.
 
@@ -247,16 +504,74 @@ class delta:
             >>> db.sql("select * from mytable")
         """
         dtype = dtype if dtype else self.config.dtype 
-        if lazy: return self.__delta_sql_context.execute(query)
-        try: data:DataFrame = self.__delta_sql_context.execute(query).collect()
+        if lazy: return self.__execute(query)
+        try:
+            if active():
+                plan = self.__execute(query)
+                record(plan_depth=plan_depth(plan), attributes={"query": query})
+                data:DataFrame = None
+                if self.config.profile:
+                    try: data, timings = plan.profile(); record(profile=timings)
+                    except ComputeError: pass # plans without timed nodes can not be profiled
+                if data is None: data = plan.collect()
+                record(rows_out=data.height)
+            else: data:DataFrame = self.__execute(query).collect()
         except SchemaError as e: data:DataFrame = DataFrame(
-                schema=self.__delta_sql_context.execute(query).collect_schema()
+                schema=self.__execute(query).collect_schema()
             )
         match dtype:
             case "polars": return data
             case "json": return data.to_dicts()
             case _: raise ValueError(f"'dtype' was provided as '{dtype}', type must be one of the following ['polars', 'json']")
 
+    @instrument
+    def explain(self, query:str, optimized:bool=True) -> dict:
+        """ describes how the provided sql query will be executed, without executing it.
+
+            for each table referenced by the query, reports the delta files selected versus the total after pruning, or the plan depth of staged tables that have not been committed. the memory footprint is estimated from the record counts and stats in the delta log.
+
+            **args**:
+            - **query**: the sql query to explain.
+            - **optimized**: `optional` return the optimized query plan. default is `true`.
+
+            >>> db.explain("select * from mytable where year = 2021")
+            >>> # output: {"plan": "...", "tables": {"mytable": {"files_selected": 1, "files_total": 4, ...}}, "estimated_bytes": 1024}
+        """
+        plan = self.__execute(query).explain(optimized=optimized)
+        names = identifiers(query)
+
+        tables, estimated_bytes = {}, 0
+        for table in self.tables:
+            if table not in names: continue
+            source = self.__delta_sql_context_source.get(table)
+            if source is None:
+                staged = self.__delta_sql_context.execute(f"select * from {table}")
+                tables[table] = dict(staged=True, plan_depth=plan_depth(staged))
+                continue
+
+            delta_table, dataset, _ = source
+            schema = self.__delta_sql_context_schema[table]
+            actions = {action["path"]: action for action in delta_table.get_add_actions(flatten=True).to_pylist()}
+            dataset = self.__prune(query, table) or dataset
+            selected = [actions[fragment.path] for fragment in dataset.get_fragments() if fragment.path in actions]
+            columns = projected_columns(query, schema)
+            size = estimate_bytes(schema, columns, selected)
+
+            tables[table] = dict(
+                staged=False,
+                version=delta_table.version(),
+                files_selected=len(selected),
+                files_total=len(actions),
+                bytes_selected=sum(action["size_bytes"] for action in selected),
+                bytes_total=sum(action["size_bytes"] for action in actions.values()),
+                columns=columns,
+                estimated_bytes=size,
+            )
+            estimated_bytes += size
+
+        return dict(plan=plan, tables=tables, estimated_bytes=estimated_bytes)
+
+    @instrument
     def commit(self, 
         table:str,
         force:bool=False,
@@ -288,6 +603,166 @@ class delta:
         try: data.write_delta(table_path, **options)
         except Exception as e: return e
 
+        if active():
+            sizes = DeltaTable(table_path).get_add_actions().column("size_bytes").to_pylist()
+            record(rows_out=data.height, files_touched=len(sizes), bytes_written=sum(sizes))
+
+    @instrument
+    def changes(self,
+        table:str,
+        from_version:int,
+        to_version:int=None,
+        primary_key:str=None,
+        database:str="default",
+        dtype:str=None,
+    ) -> DataFrame | list[dict] | Exception:
+        """ returns the rows inserted, updated and deleted between two committed versions of a table.
+
+            the changed files are found from the add and remove actions in the delta log, or from the change data feed when `delta.enableChangeDataFeed` is enabled on the table, so only those files are read. rows rewritten without changes cancel out. `commit` overwrites the whole table, so between versions written by `commit` every file changes and both versions are read in full. only tables written incrementally, such as by merges or appends with `deltalake`, avoid the full scan.
+
+            **args**:
+            - **table**: the name of the table.
+            - **from_version**: the version to compare from, changes made in this version are not included.
+            - **to_version**: `optional` the version to compare to. default is the latest version.
+            - **primary_key**: `optional` the primary key used to report updates, otherwise updates are reported as a delete and an insert.
+            - **database**: `optional` name of the database. default is `'default'`.
+            - **dtype**: `optional` sets the output data type. default is `'json'`.
+
+            returns no rows when `from_version` is the latest version, and a `ValueError` when it is after `to_version`.
+
+            >>> db.changes(table="mytable", from_version=1, to_version=3, primary_key="id")
+            >>> # output: [{"id": 1, "name": "alice", "_change_type": "update"}, ...]
+        """
+        dtype = dtype if dtype else self.config.dtype
+        if to_version is not None and from_version > to_version:
+            return ValueError(f"'from_version' was provided as '{from_version}', which is after 'to_version' '{to_version}'")
+
+        table_path = join(self.__delta_source, database, table)
+        target = self.__load(table_path, version=to_version)
+
+        if from_version >= target.version():
+            added = removed = from_arrow(target.schema().to_pyarrow().empty_table())
+        elif target.metadata().configuration.get("delta.enableChangeDataFeed") == "true":
+            feed = from_arrow(target.load_cdf(starting_version=from_version + 1, ending_version=target.version()).read_all())
+            added = feed.filter(col("_change_type").is_in(["insert", "update_postimage"])).drop(CDF_COLUMNS)
+            removed = feed.filter(col("_change_type").is_in(["delete", "update_preimage"])).drop(CDF_COLUMNS)
+        else:
+            source = self.__load(table_path, version=from_version)
+            target_files, source_files = set(target.files()), set(source.files())
+            added = self.__read(target, target_files - source_files)
+            removed = self.__read(source, source_files - target_files)
+
+        increment(rows_in=added.height + removed.height)
+        data = net_changes(added, removed, primary_key=primary_key)
+        record(rows_out=data.height)
+
+        match dtype:
+            case "polars": return data
+            case "json": return data.to_dicts()
+            case _: raise ValueError(f"'dtype' was provided as '{dtype}', type must be one of the following ['polars', 'json']")
+
+    def __read(self, delta_table:DeltaTable, paths:set[str]) -> DataFrame:
+        """ reads the provided files of a loaded delta table. """
+        dataset = self.__dataset(delta_table)
+        fragments = [fragment for fragment in dataset.get_fragments() if fragment.path in paths]
+        return scan_pyarrow_dataset(FileSystemDataset(fragments, dataset.schema, dataset.format, dataset.filesystem)).collect()
+
+    @instrument
+    def create_materialized_view(self, name:str, query:str, persist:bool=False, database:str="default") -> Exception:
+        """ registers the result of a sql query in the sql context as a table that is kept up to date as the tables it reads change.
+
+            views reading a single table with filters and projections, or grouped `sum`, `count`, `min` and `max` aggregates, are updated from the rows changed by `upsert` and `delete` instead of running the query again. projection views need the primary key of the table in their output, and `min` or `max` views are recomputed when rows are updated or deleted. any other query is recomputed when a table it reads changes.
+
+            **args**:
+            - **name**: the name of the view within the sql context.
+            - **query**: the sql query of the view.
+            - **persist**: `optional` commit the view to the delta source whenever it changes. default is `false`.
+            - **database**: `optional` the name of the database the view is committed to. default is `'default'`.
+
+            >>> db.create_materialized_view("totals", "select job, sum(salary) as total, count(*) as people from employees group by job")
+            >>> db.create_materialized_view("engineers", "select id, name from employees where job = 'engineer'", persist=True)
+        """
+        kind, table, items, functions = plan_view(query)
+        tables = set(tables_and_aliases(query).values()) & set(self.tables)
+        if name in tables: return ValueError(f"materialized view `{name}` can not read from itself")
+
+        view = delta_view(name=name, query=query, kind=kind, tables=tables, table=table, items=items, functions=functions, database=database, persist=persist)
+        if err := self.__refresh_view(view): return err
+
+        self.__delta_views[name] = view
+        record(attributes={"kind": kind})
+
+    @instrument
+    def drop_materialized_view(self, name:str) -> Exception:
+        """ stops maintaining a materialized view and removes it from the sql context. views committed to the delta source are not deleted.
+
+            **args**:
+            - **name**: the name of the view.
+
+            >>> db.drop_materialized_view("totals")
+        """
+        if self.__delta_views.pop(name, None) is None: return ValueError(f"materialized view `{name}` does not exist")
+        self.__delta_sql_context.unregister(name)
+        self.__delta_sql_context_schema.pop(name, None)
+        self.__release(name)
+
+    def __views(self, table:str) -> list[delta_view]:
+        """ returns the materialized views that read a table. """
+        return [view for view in self.__delta_views.values() if table in view.tables and view.name != table]
+
+    def __refresh_views(self, table:str) -> Exception:
+        """ recomputes the materialized views that read a table. """
+        for view in self.__views(table):
+            if err := self.__refresh_view(view): return err
+
+    def __refresh_view(self, view:delta_view) -> Exception:
+        """ recomputes a materialized view from its query. """
+        try: view.data = self.__execute(counted(view.query) if view.kind == "aggregate" else view.query).collect()
+        except PolarsError as e: return e
+        return self.__publish(view)
+
+    def __maintain_views(self, table:str, added:DataFrame=None, removed:DataFrame=None) -> Exception:
+        """ applies the rows changed in a table to the materialized views that read it, recomputing views that can not be updated from the changes.
+
+            **args**:
+            - **table**: the name of the changed table.
+            - **added**: `optional` the new values of the changed rows.
+            - **removed**: `optional` the previous values of the changed rows.
+        """
+        for view in self.__views(table):
+            if added is not None and self.__update_view(view, table, added, removed): err = self.__publish(view)
+            else: err = self.__refresh_view(view)
+            if err: return err
+
+    def __update_view(self, view:delta_view, table:str, added:DataFrame, removed:DataFrame) -> bool:
+        """ updates a materialized view from the rows changed in a table, returning false when the view has to be recomputed. """
+        primary_key = self.__delta_primary_keys.get(table)
+        execute = lambda query, rows: SQLContext(frames={table: rows}).execute(query).collect()
+
+        try:
+            if view.kind == "aggregate" and view.table == table:
+                if removed.height and any(function in ("min", "max") for function in view.functions): return False
+                query = counted(view.query)
+                view.data = merge_aggregates(view.data, execute(query, added), execute(query, removed), view.keys, view.aggregates)
+            elif view.kind == "rows" and view.table == table and primary_key and view.projects(primary_key):
+                changed = concat([added.select(primary_key), removed.select(primary_key)], how="vertical_relaxed")[primary_key]
+                view.data = merge_rows(view.data, execute(view.query, added), changed, primary_key)
+            else: return False
+        except PolarsError as e:
+            debugger.debug(f"recomputing materialized view `{view.name}`: {e}")
+            return False
+
+        increment(rows_in=added.height + removed.height)
+        return True
+
+    def __publish(self, view:delta_view) -> Exception:
+        """ registers a materialized view in the sql context, commits it when persisted, and refreshes the views that read it. """
+        err = self.__register(table=view.name, data=view.data.drop(HIDDEN_COUNT, strict=False), database=view.database)
+        if err: return err
+        if view.persist and (err := self.commit(view.name, force=True, database=view.database)): return err
+        return self.__refresh_views(view.name)
+
+    @instrument
     def checkout(self, table:str, version:int|str|datetime, database:str="default") -> Exception:
         """ reloads a previous version of a table from the delta source into the sql context.
 
@@ -300,6 +775,26 @@ class delta:
         """
         return self.register(database=database, table=table, version=version)
     
+    def serve(self, socket_path:str="/tmp/deltabase.sock", block:bool=True):
+        """ serves this instance to `delta_client` processes over a unix socket, so they share its sql context, caches and staged state without connecting and scanning tables themselves.
+
+            **args**:
+            - **socket_path**: `optional` the path of the unix socket. default is `'/tmp/deltabase.sock'`.
+            - **block**: `optional` serve from the current thread until interrupted, otherwise return the running server. default is `true`.
+
+            >>> db.serve("/tmp/deltabase.sock")
+            >>> server = db.serve("/tmp/deltabase.sock", block=False); server.stop()
+
+            raises `NotImplementedError` on platforms without unix sockets.
+        """
+        if delta_server is None: raise NotImplementedError("the query server requires unix sockets, which are not supported on this platform.")
+        server = delta_server(self, socket_path)
+        if not block: return server.start()
+        try: server.serve_forever()
+        except KeyboardInterrupt: pass
+        finally: server.server_close()
+
+    @instrument
     def schema(self, table:str) -> Schema|None:
         """ reloads a previous version of a table from the delta source into the sql context.
 
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2024  darryl mcculley
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from polars import DataFrame, concat, struct, col, lit, when
+
+CHANGE_TYPE = "_change_type"
+CDF_COLUMNS = ["_change_type", "_commit_version", "_commit_timestamp"]
+
+def net_changes(added:DataFrame, removed:DataFrame, primary_key:str=None) -> DataFrame:
+    """ reduces the rows added and removed between two versions of a table to the rows that actually changed.
+
+        rows that were removed and added back unchanged, such as those rewritten by an overwrite commit, cancel out. when a primary key is provided, a key that was both removed and added is reported once as an update.
+
+        **args**:
+        - **added**: rows added between the versions.
+        - **removed**: rows removed between the versions.
+        - **primary_key**: `optional` the column identifying a row, used to report updates.
+
+        returns the changed rows with a `_change_type` column of `'insert'`, `'update'` or `'delete'`.
+    """
+    rows = concat([
+        added.with_columns(lit(True).alias(CHANGE_TYPE)),
+        removed.with_columns(lit(False).alias(CHANGE_TYPE)),
+    ], how="diagonal_relaxed")
+
+    columns = [column for column in rows.columns if column != CHANGE_TYPE]
+    rows = rows.with_columns(struct(columns).hash().alias("_delta_row"))
+
+    added = rows.filter(col(CHANGE_TYPE))
+    removed = rows.filter(~col(CHANGE_TYPE))
+    added, removed = (
+        added.join(removed, on="_delta_row", how="anti"),
+        removed.join(added, on="_delta_row", how="anti"),
+    )
+
+    if primary_key is None:
+        added = added.with_columns(lit("insert").alias(CHANGE_TYPE))
+    else:
+        added = added.with_columns(
+            when(col(primary_key).is_in(removed[primary_key]))
+            .then(lit("update")).otherwise(lit("insert"))
+            .alias(CHANGE_TYPE)
+        )
+        removed = removed.filter(~col(primary_key).is_in(added[primary_key]))
+
+    removed = removed.with_columns(lit("delete").alias(CHANGE_TYPE))
+    return concat([added, removed]).drop("_delta_row")
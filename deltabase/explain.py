@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2024  darryl mcculley
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from re import findall, search, IGNORECASE
+
+from polars import Schema, Int8, Int16, Int32, Int64, UInt8, UInt16, UInt32, UInt64, Float32, Float64, Boolean, Date, Datetime, Duration, Time
+
+WIDTHS = {
+    Boolean: 1, Int8: 1, UInt8: 1,
+    Int16: 2, UInt16: 2,
+    Int32: 4, UInt32: 4, Float32: 4, Date: 4,
+    Int64: 8, UInt64: 8, Float64: 8, Datetime: 8, Duration: 8, Time: 8,
+}
+
+VARIABLE_WIDTH = 16
+
+def identifiers(query:str) -> set[str]:
+    """ returns every identifier like token in a sql query, used to find the tables and columns it references. """
+    return set(findall(r"\w+", query))
+
+def projected_columns(query:str, schema:Schema) -> list[str]:
+    """ returns the columns of a table referenced by a sql query, or every column when the query selects `*`. """
+    if search(r"select\s+(distinct\s+)?(\w+\.)?\*", query, IGNORECASE): return schema.names()
+    names = identifiers(query)
+    return [column for column in schema.names() if column in names]
+
+def estimate_bytes(schema:Schema, columns:list[str], actions:list[dict]) -> int:
+    """ estimates the in-memory size of the provided columns across delta files, using the record counts in the delta log.
+
+        fixed width columns use their exact width, variable width columns use the average length of their min and max stats when available.
+
+        **args**:
+        - **schema**: the schema of the table.
+        - **columns**: the columns that will be loaded.
+        - **actions**: flattened delta log add actions for the files that will be loaded.
+    """
+    total = 0
+    for action in actions:
+        width = 0
+        for column in columns:
+            fixed = WIDTHS.get(schema[column].base_type())
+            if fixed: width += fixed; continue
+            bounds = [action.get(f"min.{column}"), action.get(f"max.{column}")]
+            lengths = [len(value) for value in bounds if isinstance(value, str|bytes)]
+            width += VARIABLE_WIDTH + (sum(lengths) // len(lengths) if lengths else 0)
+        total += (action.get("num_records") or 0) * width
+    return total
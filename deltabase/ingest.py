@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2024  darryl mcculley
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from collections.abc import Iterator
+from itertools import chain
+from pathlib import Path
+from typing import Any
+
+from polars import DataFrame, LazyFrame, Schema, from_dicts, from_dict, from_arrow, scan_parquet, scan_ndjson
+from polars.exceptions import ComputeError, SchemaError
+from pyarrow import Table, RecordBatch, RecordBatchReader
+
+NDJSON = (".ndjson", ".jsonl", ".json")
+PARQUET = (".parquet",)
+
+TYPES = "'list[dict]' | 'dict' | 'DataFrame' | 'LazyFrame' | 'pyarrow.Table' | 'pyarrow.RecordBatch' | 'pyarrow.RecordBatchReader' | 'Iterator[pyarrow.RecordBatch]' | '.parquet' or '.ndjson' file path"
+
+def to_lazyframe(data:Any, schema:Schema|None=None) -> LazyFrame:
+    """ converts supported upsert data to a lazyframe, building columns with the known table schema instead of inferring their types row by row.
+
+        **args**:
+        - **data**: a list of records, a record or column-oriented dictionary, a `DataFrame` or `LazyFrame`, a pyarrow table, record batch, record batch reader or iterator of record batches, or the path of a parquet or ndjson file.
+        - **schema**: `optional` the schema of the table the data is upserted into. columns not in the schema are inferred.
+
+        raises `ValueError` for unsupported data.
+
+        >>> to_lazyframe([{"id": 1, "name": "alice"}], schema=Schema({"id": Int64, "name": String}))
+        >>> to_lazyframe("batch.parquet")
+    """
+    overrides = dict(schema) if schema else None
+
+    if isinstance(data, LazyFrame): return data
+    if isinstance(data, DataFrame): return data.lazy()
+
+    if isinstance(data, list) and len(data) > 0 and isinstance(data[0], dict):
+        try: return from_dicts(data, schema_overrides=overrides).lazy()
+        except (ComputeError, SchemaError, TypeError, ValueError): return from_dicts(data).lazy()
+
+    if isinstance(data, dict):
+        try: return from_dict(data, schema_overrides=overrides).lazy()
+        except (ComputeError, SchemaError, TypeError, ValueError): return from_dict(data).lazy()
+
+    if isinstance(data, Table|RecordBatch): return from_arrow(data).lazy()
+    if isinstance(data, RecordBatchReader): return from_arrow(data.read_all()).lazy()
+
+    if isinstance(data, str|Path):
+        suffix = Path(data).suffix.lower()
+        if suffix in PARQUET: return scan_parquet(data)
+        if suffix in NDJSON:
+            columns = scan_ndjson(data).collect_schema().names()
+            return scan_ndjson(data, schema_overrides={name: dtype for name, dtype in (overrides or {}).items() if name in columns})
+        raise ValueError(f"'data' was provided as a path to a '{suffix}' file, file must be one of {PARQUET + NDJSON}")
+
+    if isinstance(data, Iterator) or (isinstance(data, list) and len(data) > 0 and isinstance(data[0], RecordBatch)):
+        batches = iter(data)
+        first = next(batches, None)
+        if isinstance(first, RecordBatch): return from_arrow(Table.from_batches(chain([first], batches))).lazy()
+
+    raise ValueError(f"'data' was provided as '{type(data)}', type must be {TYPES}")
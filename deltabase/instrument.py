@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2024  darryl mcculley
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from inspect import signature, ismethod
+from logging import getLogger, DEBUG
+from time import perf_counter, time
+from typing import Any, Callable
+
+from polars import DataFrame, LazyFrame
+
+debugger = getLogger("deltabase")
+
+@dataclass
+class delta_metrics:
+    """ measurements collected for a single public `delta` operation. fields are `None` when they do not apply or could not be measured without executing the query. """
+    operation:str
+    table:str|None=None
+    started:float=0.0
+    duration:float=0.0
+    rows_in:int|None=None
+    rows_out:int|None=None
+    bytes_read:int|None=None
+    bytes_written:int|None=None
+    files_touched:int|None=None
+    plan_depth:int|None=None
+    profile:DataFrame|None=None
+    error:Exception|None=None
+    attributes:dict[str, Any]=field(default_factory=dict)
+
+current_metrics:ContextVar[delta_metrics|None] = ContextVar("deltabase_metrics", default=None)
+
+def record(**kwargs):
+    """ sets fields on the metrics of the operation in progress, does nothing when instrumentation is disabled.
+
+        >>> record(rows_out=100, bytes_written=4096)
+    """
+    metrics = current_metrics.get()
+    if metrics is None: return
+    for name, value in kwargs.items(): setattr(metrics, name, value)
+
+def increment(**kwargs):
+    """ adds to fields on the metrics of the operation in progress, for measurements taken more than once per operation.
+
+        >>> increment(files_touched=2, bytes_read=8192)
+    """
+    metrics = current_metrics.get()
+    if metrics is None: return
+    for name, value in kwargs.items(): setattr(metrics, name, (getattr(metrics, name) or 0) + value)
+
+def active() -> bool:
+    """ returns true when the current operation is being instrumented, used to guard measurements that have a cost. """
+    return current_metrics.get() is not None
+
+def plan_depth(data:LazyFrame) -> int:
+    """ returns the depth of the unoptimized query plan of a lazyframe. """
+    lines = data.explain(optimized=False).splitlines()
+    return max((len(line) - len(line.lstrip())) // 2 for line in lines) + 1 if lines else 0
+
+def rows_of(data:Any) -> int|None:
+    """ returns the number of rows in the provided data without executing any lazy query. """
+    if isinstance(data, DataFrame): return data.height
+    if isinstance(data, list): return len(data)
+    if isinstance(data, dict):
+        values = list(data.values())
+        return len(values[0]) if values and isinstance(values[0], list) else 1
+    return None
+
+def instrument(method:Callable) -> Callable:
+    """ wraps a public `delta` method to collect `delta_metrics` for it.
+
+        metrics are only collected when `delta_config.instrument` is set or the `deltabase` logger is enabled for debug, otherwise the method is called directly. nested operations, such as the `register` performed by `upsert`, are recorded on the outermost operation.
+    """
+    parameters = signature(method).parameters
+    names = list(parameters)[1:]
+    defaults = {name: parameter.default for name, parameter in parameters.items()}
+    bind = lambda args, kwargs: {**defaults, **dict(zip(names, args)), **kwargs}
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if current_metrics.get() is not None: return method(self, *args, **kwargs)
+
+        config = vars(self).get("config") or bind(args, kwargs).get("config")
+        hook = getattr(config, "instrument", None)
+        if ismethod(hook) and hook.__self__ is config: hook = hook.__func__ # hooks set on `delta_config` itself are bound to the instance
+        if hook is None and not debugger.isEnabledFor(DEBUG): return method(self, *args, **kwargs)
+
+        arguments = bind(args, kwargs)
+        metrics = delta_metrics(operation=method.__name__, table=arguments.get("table"), started=time())
+        metrics.rows_in = rows_of(arguments.get("data"))
+        token = current_metrics.set(metrics)
+        start = perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+            if isinstance(result, Exception): metrics.error = result
+            return result
+        except Exception as e:
+            metrics.error = e
+            raise e
+        finally:
+            metrics.duration = perf_counter() - start
+            current_metrics.reset(token)
+            debugger.debug(metrics)
+            if hook is not None: hook(metrics)
+
+    return wrapper
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2024  darryl mcculley
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from datetime import date, datetime
+from functools import reduce
+from re import compile, findall, search, sub, IGNORECASE, DOTALL
+from typing import Any
+
+from polars import Schema, String, Boolean, Date, Datetime, Decimal
+from pyarrow.dataset import Expression, field
+
+IDENTIFIER = r'(?:(\w+)\.)?"?(\w+)"?'
+LITERAL = r"(-?\d+(?:\.\d+)?|'(?:[^']|'')*'|true|false)"
+OPERATORS = {"=": "==", "==": "==", "!=": "!=", "<>": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+FLIPPED = {"==": "==", "!=": "!=", "<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+COMPARISON = compile(rf"^{IDENTIFIER}\s*(==|=|!=|<>|<=|>=|<|>)\s*{LITERAL}$", IGNORECASE)
+COMPARISON_FLIPPED = compile(rf"^{LITERAL}\s*(==|=|!=|<>|<=|>=|<|>)\s*{IDENTIFIER}$", IGNORECASE)
+BETWEEN = compile(rf"^{IDENTIFIER}\s+between\s+{LITERAL}\s+and\s+{LITERAL}$", IGNORECASE)
+MEMBERSHIP = compile(rf"^{IDENTIFIER}\s+in\s*\((.*)\)$", IGNORECASE | DOTALL)
+NULLS = compile(rf"^{IDENTIFIER}\s+is\s+(not\s+)?null$", IGNORECASE)
+AND = compile(r"\s+and\s+", IGNORECASE)
+OR = compile(r"\s+or\s+", IGNORECASE)
+
+CLAUSE_END = r"\b(group\s+by|order\s+by|having|limit|window|qualify)\b|$"
+KEYWORDS = {"where", "on", "using", "join", "left", "right", "inner", "outer", "full", "cross", "natural", "group", "order", "limit", "having", "union", "semi", "anti"}
+
+def where_clause(query:str) -> str|None:
+    """ returns the where clause of a single select statement, or none when the query is not simple enough to prune safely. """
+    lowered = query.lower()
+    if len(findall(r"\bselect\b", lowered)) != 1: return None
+    if search(r"\b(union|intersect|except)\b", lowered): return None
+    match = search(rf"\bwhere\b(.*?)(?:{CLAUSE_END})", query, IGNORECASE | DOTALL)
+    return match.group(1).strip() if match else None
+
+def conjuncts(clause:str) -> list[str]:
+    """ splits a where clause on its top level `and` operators, keeping `between ... and ...` together. """
+    parts, depth, quoted, start, index = [], 0, False, 0, 0
+    while index < len(clause):
+        char = clause[index]
+        if char == "'": quoted = not quoted
+        elif not quoted and char == "(": depth += 1
+        elif not quoted and char == ")": depth -= 1
+        elif not quoted and depth == 0 and (match := AND.match(clause, index)):
+            part = clause[start:index]
+            if not search(r"\bbetween\b", part, IGNORECASE) or search(r"\bbetween\b.*\band\b", part, IGNORECASE | DOTALL):
+                parts.append(part)
+                start = match.end()
+            index = match.end()
+            continue
+        index += 1
+    parts.append(clause[start:])
+    return [strip_parentheses(part.strip()) for part in parts if part.strip()]
+
+def disjunctive(clause:str) -> bool:
+    """ returns true when a condition has a top level `or` operator, which binds looser than `and`. """
+    depth, quoted = 0, False
+    for index, char in enumerate(clause):
+        if char == "'": quoted = not quoted
+        elif not quoted and char == "(": depth += 1
+        elif not quoted and char == ")": depth -= 1
+        elif not quoted and depth == 0 and OR.match(clause, index): return True
+    return False
+
+def strip_parentheses(part:str) -> str:
+    """ removes parentheses that wrap an entire condition. """
+    while part.startswith("(") and part.endswith(")"):
+        depth = 0
+        for index, char in enumerate(part):
+            depth += char == "("
+            depth -= char == ")"
+            if depth == 0 and index < len(part) - 1: return part
+        part = part[1:-1].strip()
+    return part
+
+def tables_and_aliases(query:str) -> dict[str, str]:
+    """ returns a mapping of every table name and alias in the from and join clauses to the table name. """
+    names = {}
+    for table, alias in findall(r"\b(?:from|join)\s+\"?(\w+)\"?(?:\s+(?:as\s+)?(\w+))?", query, IGNORECASE):
+        names[table] = table
+        if alias and alias.lower() not in KEYWORDS: names[alias] = table
+    return names
+
+def literal(value:str, dtype) -> Any:
+    """ converts a sql literal to a python value matching the column dtype, raises `ValueError` when they are incompatible. """
+    if value.startswith("'"):
+        text = value[1:-1].replace("''", "'")
+        if dtype == String: return text
+        if dtype == Date: return date.fromisoformat(text)
+        if dtype.base_type() == Datetime and dtype.time_zone is None: return datetime.fromisoformat(text)
+        raise ValueError(text)
+    if value.lower() in ("true", "false"):
+        if dtype == Boolean: return value.lower() == "true"
+        raise ValueError(value)
+    if not dtype.is_numeric() or dtype.base_type() == Decimal: raise ValueError(value)
+    number = float(value) if "." in value else int(value)
+    if dtype.is_unsigned_integer() and number < 0 or dtype.is_integer() and isinstance(number, float): raise ValueError(value)
+    return number
+
+def compare(column:str, operator:str, value:Any) -> Expression:
+    """ returns a pyarrow comparison between a column and a value. """
+    match operator:
+        case "==": return field(column) == value
+        case "!=": return field(column) != value
+        case "<": return field(column) < value
+        case "<=": return field(column) <= value
+        case ">": return field(column) > value
+        case ">=": return field(column) >= value
+
+def predicate(query:str, table:str, schemas:dict[str, Schema]) -> Expression|None:
+    """ extracts a pyarrow filter for a table from the where clause of a sql query, for pruning delta files with partition values and log stats before scanning.
+
+        only queries without a top level `or`, and top level `and` conditions comparing a column of the table to literals are used, with `=`, `!=`, `<`, `<=`, `>`, `>=`, `between`, `in` and `is [not] null`. the filter may select more files than needed but never fewer, since the full query is still applied to the scanned data.
+
+        **args**:
+        - **query**: the sql query.
+        - **table**: the table to extract a filter for.
+        - **schemas**: the schemas of every table in the sql context, used to resolve unqualified columns.
+
+        >>> predicate("select * from t where year = 2021 and id > 10", "t", schemas)  # output: (year == 2021) and (id > 10)
+    """
+    clause = where_clause(query)
+    if not clause or disjunctive(clause): return None
+
+    if findall(r"\b(?:from|join)\s+\"?(\w+)", query, IGNORECASE).count(table) != 1: return None
+
+    names = tables_and_aliases(query)
+    referenced = {name for name in names.values() if name in schemas}
+    joined = search(r"\bjoin\b", query, IGNORECASE) is not None
+
+    def owned(qualifier:str, column:str) -> bool:
+        if column not in schemas[table]: return False
+        if qualifier: return names.get(qualifier) == table
+        return not any(column in schemas[other] for other in referenced if other != table)
+
+    expressions = []
+    for condition in conjuncts(clause):
+        if disjunctive(condition): continue
+        try:
+            if match := COMPARISON.match(condition):
+                qualifier, column, operator, value = match.groups()
+                if owned(qualifier, column): expressions.append(compare(column, OPERATORS[operator], literal(value, schemas[table][column])))
+            elif match := COMPARISON_FLIPPED.match(condition):
+                value, operator, qualifier, column = match.groups()
+                if owned(qualifier, column): expressions.append(compare(column, FLIPPED[OPERATORS[operator]], literal(value, schemas[table][column])))
+            elif match := BETWEEN.match(condition):
+                qualifier, column, low, high = match.groups()
+                if owned(qualifier, column):
+                    dtype = schemas[table][column]
+                    expressions.append((field(column) >= literal(low, dtype)) & (field(column) <= literal(high, dtype)))
+            elif match := MEMBERSHIP.match(condition):
+                qualifier, column, values = match.groups()
+                literals = findall(LITERAL, values)
+                if owned(qualifier, column) and literals and not sub(LITERAL, "", values).replace(",", "").strip():
+                    expressions.append(field(column).isin([literal(value, schemas[table][column]) for value in literals]))
+            elif (match := NULLS.match(condition)) and not joined:
+                qualifier, column, negated = match.groups()
+                if owned(qualifier, column): expressions.append(field(column).is_valid() if negated else field(column).is_null())
+        except ValueError: continue
+
+    return reduce(lambda left, right: left & right, expressions) if expressions else None
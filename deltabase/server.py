@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2024  darryl mcculley
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+""" a local query server holding one warm `delta` instance, serving `sql` results as arrow ipc streams over a unix socket.
+
+    >>> python -m deltabase.server --path mydelta --socket /tmp/deltabase.sock
+"""
+
+from argparse import ArgumentParser
+from json import dumps, loads
+from logging import getLogger
+from os import remove, stat
+from os.path import exists
+from socket import socket, AF_UNIX, SOCK_STREAM
+from socketserver import StreamRequestHandler, ThreadingUnixStreamServer
+from stat import S_ISSOCK
+from struct import pack, unpack
+from threading import Lock, Thread
+
+from polars import DataFrame, from_arrow
+from pyarrow import Table
+from pyarrow.ipc import new_stream, open_stream
+
+debugger = getLogger("deltabase.server")
+
+OK = b"\x00"
+ERROR = b"\x01"
+
+def send_message(stream, message:dict|str):
+    """ writes a length prefixed utf-8 message. """
+    payload = (dumps(message) if isinstance(message, dict) else message).encode()
+    stream.write(pack(">I", len(payload)) + payload)
+
+def receive_message(stream) -> str|None:
+    """ reads a length prefixed utf-8 message, or returns none when the stream is closed. """
+    header = stream.read(4)
+    if len(header) < 4: return None
+    return stream.read(unpack(">I", header)[0]).decode()
+
+class delta_request_handler(StreamRequestHandler):
+    def handle(self):
+        while (message := receive_message(self.rfile)) is not None:
+            try: result = self.server.execute(loads(message))
+            except Exception as e:
+                self.wfile.write(ERROR)
+                send_message(self.wfile, f"{type(e).__name__}: {e}")
+                self.wfile.flush()
+                continue
+
+            self.wfile.write(OK)
+            with new_stream(self.wfile, result.schema) as writer: writer.write_table(result)
+            self.wfile.flush()
+
+class delta_server(ThreadingUnixStreamServer):
+    """ serves a `delta` instance over a unix socket. queries are executed one at a time against the shared sql context, results are streamed to clients concurrently.
+
+        **args**:
+        - **delta**: the connected delta instance to serve.
+        - **socket_path**: the path of the unix socket.
+
+        >>> server = delta_server(db, "/tmp/deltabase.sock")
+        >>> server.start()  # serve from a background thread
+        >>> server.serve_forever()  # or block the current thread
+    """
+    daemon_threads = True
+
+    def __init__(self, delta, socket_path:str):
+        if exists(socket_path):
+            if not S_ISSOCK(stat(socket_path).st_mode): raise FileExistsError(f"`{socket_path}` exists and is not a unix socket")
+            try:
+                with socket(AF_UNIX, SOCK_STREAM) as probe: probe.connect(socket_path)
+                raise OSError(f"a server is already listening on `{socket_path}`")
+            except ConnectionRefusedError: remove(socket_path)
+        super().__init__(socket_path, delta_request_handler)
+        self.delta = delta
+        self.socket_path = socket_path
+        self.__lock = Lock()
+        self.__thread:Thread = None
+
+    def execute(self, request:dict) -> Table:
+        """ executes a client request, returning the result as an arrow table. """
+        with self.__lock:
+            match request.get("method"):
+                case "sql": data:DataFrame = self.delta.sql(request["query"], dtype="polars")
+                case "tables": data:DataFrame = DataFrame({"table": self.delta.tables}, schema={"table": str})
+                case method: raise ValueError(f"'method' was provided as '{method}', method must be one of the following ['sql', 'tables']")
+        return data.to_arrow()
+
+    def start(self) -> "delta_server":
+        """ serves requests from a background thread. """
+        self.__thread = Thread(target=self.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def server_close(self):
+        super().server_close()
+        if exists(self.socket_path): remove(self.socket_path)
+
+    def stop(self):
+        """ stops serving requests and removes the unix socket. """
+        self.shutdown()
+        self.server_close()
+        if self.__thread: self.__thread.join()
+
+class delta_client:
+    """ a thin client for a `delta_server`. arrow results are read from the socket without converting through python objects.
+
+        **args**:
+        - **socket_path**: the path of the unix socket of the server.
+
+        >>> client = delta_client("/tmp/deltabase.sock")
+        >>> client.sql("select * from mytable", dtype="polars")
+    """
+    def __init__(self, socket_path:str):
+        self.socket_path = socket_path
+        self.__socket = socket(AF_UNIX, SOCK_STREAM)
+        self.__socket.connect(socket_path)
+        self.__rfile = self.__socket.makefile("rb")
+        self.__wfile = self.__socket.makefile("wb")
+
+    def __request(self, request:dict) -> Table:
+        send_message(self.__wfile, request)
+        self.__wfile.flush()
+        if self.__rfile.read(1) == ERROR: raise RuntimeError(receive_message(self.__rfile))
+        return open_stream(self.__rfile).read_all()
+
+    @property
+    def tables(self) -> list[str]:
+        """ list all tables within the sql context of the server. """
+        return self.__request({"method": "tables"}).column("table").to_pylist()
+
+    def sql(self, query:str, dtype:str="json") -> DataFrame | Table | list[dict]:
+        """ executes the provided sql query on the server.
+
+            **args**:
+            - **query**: the sql query to execute.
+            - **dtype**: `optional` sets the output data type, one of `'json'`, `'polars'` or `'arrow'`. default is `'json'`.
+
+            >>> client.sql("select * from mytable")
+        """
+        data = self.__request({"method": "sql", "query": query})
+        match dtype:
+            case "arrow": return data
+            case "polars": return from_arrow(data)
+            case "json": return data.to_pylist()
+            case _: raise ValueError(f"'dtype' was provided as '{dtype}', type must be one of the following ['arrow', 'polars', 'json']")
+
+    def close(self):
+        self.__rfile.close()
+        self.__wfile.close()
+        self.__socket.close()
+
+    def __enter__(self) -> "delta_client":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def main():
+    from . import delta
+
+    parser = ArgumentParser(description="deltabase query server")
+    parser.add_argument("--path", required=True, help="the delta source to connect to.")
+    parser.add_argument("--socket", default="/tmp/deltabase.sock", help="the path of the unix socket.")
+    args = parser.parse_args()
+
+    debugger.info(f"serving `{args.path}` on `{args.socket}`")
+    delta.connect(path=args.path).serve(args.socket)
+
+if __name__ == "__main__":
+    main()
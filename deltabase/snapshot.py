@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2024  darryl mcculley
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from threading import Lock
+
+from deltalake import DeltaTable
+from deltalake.fs import DeltaStorageHandler
+from polars import DataFrame
+
+@dataclass
+class delta_snapshot:
+    """ a resolved version of a delta table, holding its file list and schema, and its data once materialized. """
+    delta_table:DeltaTable
+    committed:datetime|None=None
+    data:DataFrame|None=None
+
+    @property
+    def rows(self) -> int|None:
+        """ the number of records in the snapshot, from the delta log, or none when a file has no record count. """
+        actions = self.delta_table.get_add_actions()
+        if "num_records" not in actions.column_names: return None
+        counts = actions.column("num_records").to_pylist()
+        return None if None in counts else sum(counts)
+
+class snapshot_cache:
+    """ a least recently used cache of delta table snapshots, keyed by table path and version. """
+    def __init__(self):
+        self.__snapshots:OrderedDict[tuple[str, int], delta_snapshot] = OrderedDict()
+        self.__lock = Lock()
+
+    def get(self, table_path:str, version:int) -> delta_snapshot|None:
+        with self.__lock:
+            snapshot = self.__snapshots.get((table_path, version))
+            if snapshot is not None: self.__snapshots.move_to_end((table_path, version))
+            return snapshot
+
+    def put(self, table_path:str, version:int, snapshot:delta_snapshot, size:int):
+        with self.__lock:
+            self.__snapshots[(table_path, version)] = snapshot
+            self.__snapshots.move_to_end((table_path, version))
+            while len(self.__snapshots) > max(size, 0): self.__snapshots.popitem(last=False)
+
+    def clear(self):
+        with self.__lock: self.__snapshots.clear()
+
+    def __len__(self) -> int:
+        return len(self.__snapshots)
+
+def committed(table_path:str, version:int, storage:DeltaStorageHandler=None) -> datetime|None:
+    """ returns the commit time of a version of a table, the modification time of its log file, or none when the log file does not exist. """
+    storage = storage or DeltaStorageHandler(table_path)
+    return storage.get_file_info([f"_delta_log/{version:020}.json"])[0].mtime
+
+def resolve_version(table_path:str, timestamp:str|datetime) -> int|None:
+    """ finds the latest version of a table committed at or before a timestamp, with a binary search over the commit times in the delta log.
+
+        the commit time of a version is the modification time of its log file, matching delta-rs. naive timestamps are treated as utc.
+
+        **args**:
+        - **table_path**: the path of the table.
+        - **timestamp**: an iso 8601 string or datetime.
+
+        returns none when the version can not be resolved from the log files, such as when the timestamp is before the oldest available commit.
+    """
+    if isinstance(timestamp, str): timestamp = datetime.fromisoformat(timestamp)
+    if timestamp.tzinfo is None: timestamp = timestamp.replace(tzinfo=timezone.utc)
+
+    storage = DeltaStorageHandler(table_path)
+
+    low, high = 0, DeltaTable(table_path, without_files=True).version()
+    first = committed(table_path, low, storage)
+    if first is None or first > timestamp: return None
+
+    while low < high:
+        middle = (low + high + 1) // 2
+        mtime = committed(table_path, middle, storage)
+        if mtime is None: return None
+        if mtime <= timestamp: low = middle
+        else: high = middle - 1
+
+    return low
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright 2024  darryl mcculley
+
+#     This program is free software: you can redistribute it and/or modify
+#     it under the terms of the GNU General Public License as published by
+#     the Free Software Foundation, either version 3 of the License, or
+#     any later version.
+
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#     GNU General Public License for more details.
+
+#     You should have received a copy of the GNU General Public License
+#     along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from dataclasses import dataclass, field
+from re import compile, findall, sub, IGNORECASE, DOTALL
+
+from polars import DataFrame, Series, Int64, concat, col
+
+HIDDEN_COUNT = "__delta_mv_count"
+
+VIEW = compile(r"^\s*select\s+(.+?)\s+from\s+\"?(\w+)\"?(?:\s+(?:as\s+)?(?!where\b|group\b)\w+)?(?:\s+where\s+(.+?))?(?:\s+group\s+by\s+(.+?))?\s*;?\s*$", IGNORECASE | DOTALL)
+UNSUPPORTED = compile(r"\b(join|having|order\s+by|limit|offset|distinct|union|intersect|except|over|qualify)\b", IGNORECASE)
+AGGREGATE = compile(r"^(sum|count|min|max)\s*\(\s*(\*|(?:\w+\.)?\"?\w+\"?)\s*\)(?:\s+as\s+\"?\w+\"?)?$", IGNORECASE)
+ANY_AGGREGATE = compile(r"\b(sum|count|min|max|avg|mean|median|stddev|std|variance|var|first|last|array_agg|string_agg)\s*\(", IGNORECASE)
+COLUMN = compile(r"^(?:\w+\.)?\"?(\w+)\"?(?:\s+as\s+\"?\w+\"?)?$", IGNORECASE)
+
+@dataclass
+class delta_view:
+    """ a materialized view, the result of a query kept in the sql context and maintained as its tables change.
+
+        views over a single table with filters and projections (`'rows'`), or grouped `sum`, `count`, `min` and `max` aggregates (`'aggregate'`) are updated from the rows changed by `upsert` and `delete`. any other query is recomputed (`'recompute'`).
+    """
+    name:str
+    query:str
+    kind:str
+    tables:set[str]
+    table:str|None=None
+    items:list[str]=field(default_factory=list)
+    functions:list[str|None]=field(default_factory=list)
+    database:str="default"
+    persist:bool=False
+    data:DataFrame|None=None
+
+    @property
+    def aggregates(self) -> dict[str, str]:
+        """ the output columns of an aggregate view mapped to their aggregate function. """
+        columns = [column for column in self.data.columns if column != HIDDEN_COUNT]
+        return {column: function for column, function in zip(columns, self.functions) if function}
+
+    @property
+    def keys(self) -> list[str]:
+        """ the output columns of an aggregate view that it is grouped by. """
+        columns = [column for column in self.data.columns if column != HIDDEN_COUNT]
+        return [column for column, function in zip(columns, self.functions) if function is None]
+
+    def projects(self, column:str) -> bool:
+        """ returns true when a rows view outputs a column of its table unchanged. """
+        for item in self.items:
+            match = COLUMN.match(item)
+            if item.endswith("*") or match and match.group(1) == column and " as " not in item.lower(): return True
+        return False
+
+def split_items(select:str) -> list[str]:
+    """ splits a select list on its top level commas. """
+    items, depth, quoted, start = [], 0, False, 0
+    for index, char in enumerate(select):
+        if char == "'": quoted = not quoted
+        elif not quoted and char == "(": depth += 1
+        elif not quoted and char == ")": depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            items.append(select[start:index].strip())
+            start = index + 1
+    items.append(select[start:].strip())
+    return items
+
+def plan_view(query:str) -> tuple[str, str|None, list[str], list[str|None]]:
+    """ decides how a materialized view can be maintained. aggregate views must select every group by column, since they are merged on the selected keys.
+
+        **args**:
+        - **query**: the query of the view.
+
+        returns the kind of view, the table it reads, its select items, and the aggregate function of each item, or `None` for group by keys.
+    """
+    if UNSUPPORTED.search(query) or len(findall(r"\bselect\b", query, IGNORECASE)) != 1: return "recompute", None, [], []
+    match = VIEW.match(query)
+    if not match: return "recompute", None, [], []
+
+    select, table, _, group = match.groups()
+    items = split_items(select)
+    if group is None and not ANY_AGGREGATE.search(select): return "rows", table, items, []
+
+    functions, keys = [], set()
+    for item in items:
+        if aggregate := AGGREGATE.match(item): functions.append(aggregate.group(1).lower())
+        elif group is not None and item != "*" and (column := COLUMN.match(item)) and not ANY_AGGREGATE.search(item):
+            functions.append(None)
+            keys.add(column.group(1))
+        else: return "recompute", None, [], []
+
+    grouped = [COLUMN.match(item) for item in split_items(group)] if group is not None else []
+    if not all(grouped) or {column.group(1) for column in grouped} != keys: return "recompute", None, [], []
+    return "aggregate", table, items, functions
+
+def counted(query:str) -> str:
+    """ adds the hidden row count used to maintain an aggregate view to its query. """
+    return sub(r"^\s*select\s+", f"select count(*) as {HIDDEN_COUNT}, ", query, count=1, flags=IGNORECASE)
+
+def merge_aggregates(view:DataFrame, added:DataFrame, removed:DataFrame, keys:list[str], aggregates:dict[str, str]) -> DataFrame:
+    """ applies the partial aggregates of added and removed rows to an aggregate view.
+
+        `sum` and `count` partials of removed rows are subtracted, groups left without rows are dropped. `min` and `max` can only be merged with added rows.
+
+        **args**:
+        - **view**: the current view, including the hidden row count.
+        - **added**: the view query applied to the added rows.
+        - **removed**: the view query applied to the removed rows.
+        - **keys**: the group by columns.
+        - **aggregates**: the aggregate columns mapped to their function.
+    """
+    additive = [HIDDEN_COUNT] + [column for column, function in aggregates.items() if function in ("sum", "count")]
+    widen = lambda frame: frame.with_columns([col(column).cast(Int64) for column in additive if frame.schema[column].is_integer()])
+    removed = widen(removed).with_columns([-col(column) for column in additive])
+
+    rows = concat([widen(view), widen(added), removed], how="vertical_relaxed")
+    expressions = [col(HIDDEN_COUNT).sum()] + [
+        col(column).sum() if function in ("sum", "count") else getattr(col(column), function)()
+        for column, function in aggregates.items()
+    ]
+
+    if not keys: return rows.select(expressions).select(view.columns).cast(dict(view.schema))
+    merged = rows.group_by(keys, maintain_order=True).agg(expressions).filter(col(HIDDEN_COUNT) > 0)
+    return merged.select(view.columns).cast(dict(view.schema))
+
+def merge_rows(view:DataFrame, added:DataFrame, changed:Series, primary_key:str) -> DataFrame:
+    """ replaces the rows of a rows view whose primary key changed with the view query applied to their new values. """
+    return concat([view.filter(~col(primary_key).is_in(changed)), added], how="vertical_relaxed")
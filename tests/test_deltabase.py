@@ -1,6 +1,6 @@
 import pytest
 
-from deltabase import delta
+from deltabase import delta, delta_config
 from polars import DataFrame, LazyFrame
 from pandas import DataFrame as PandasDataFrame
 
@@ -11,6 +11,7 @@ from shutil import rmtree
 def db():
     _ = delta.connect(path="test.delta")
     yield _
+    _._delta__delta_views.clear()
     for table in _.tables:
         _._delta__delta_sql_context.unregister(table)
     if exists("test.delta"): rmtree("test.delta")
@@ -210,4 +211,355 @@ def test_collect_schema(db):
     db.config.dtype = "polars"
     db.upsert(table="test_table", primary_key="id", data=dict(id=5, name="a"))
     schema = db.schema(table="test_table")
-    assert schema == {'id': int, 'name': str}
\ No newline at end of file
+    assert schema == {'id': int, 'name': str}
+
+def test_instrument_hook(db):
+    metrics = []
+    db.config = delta_config()
+    db.config.instrument = metrics.append
+
+    db.upsert(table="test_table", primary_key="id", data=[dict(id=1, name="a"), dict(id=2, name="b")])
+    db.commit("test_table")
+    db.sql("select * from test_table", dtype="polars")
+
+    assert [m.operation for m in metrics] == ["upsert", "commit", "sql"]
+    upsert, commit, sql = metrics
+    assert upsert.table == "test_table" and upsert.rows_in == 2
+    assert commit.rows_out == 2 and commit.files_touched == 1 and commit.bytes_written > 0
+    assert sql.rows_out == 2 and sql.plan_depth >= 1
+    assert all(m.duration > 0 and m.error is None for m in metrics)
+
+def test_instrument_class_hook(db, monkeypatch):
+    metrics = []
+    def hook(metric): metrics.append(metric)
+
+    monkeypatch.setattr(delta_config, "instrument", hook)
+    db.config = delta_config()
+
+    err = db.upsert(table="test_table", primary_key="id", data=dict(id=1, name="a"))
+    assert not err, err
+    assert [metric.operation for metric in metrics] == ["upsert"]
+
+def test_instrument_profile(db):
+    metrics = []
+    db.config = delta_config()
+    db.config.instrument = metrics.append
+    db.config.profile = True
+
+    db.upsert(table="test_table", primary_key="id", data=dict(id=1, name="a"))
+    db.sql("select name, count(*) from test_table group by name", dtype="polars")
+
+    assert isinstance(metrics[-1].profile, DataFrame)
+    assert "node" in metrics[-1].profile.columns
+
+def test_explain(db):
+    db.upsert(table="test_table", primary_key="id", data=[dict(id=1, name="alice", job="teacher"), dict(id=2, name="john", job="chef")])
+    result = db.explain("select * from test_table")
+    assert isinstance(result["plan"], str)
+    assert result["tables"]["test_table"]["staged"]
+
+    db.commit("test_table", partition_by=["job"])
+    db.register(table="test_table", pyarrow_options={"partitions": [("job", "=", "chef")]})
+
+    result = db.explain("select id from test_table where job = 'chef'")
+    table = result["tables"]["test_table"]
+    assert not table["staged"]
+    assert table["files_selected"] == 1 and table["files_total"] == 2
+    assert table["columns"] == ["id", "job"]
+    assert result["estimated_bytes"] > 0
+
+def test_sql_pruning(db):
+    db.upsert(table="test_table", primary_key="id", data=[dict(id=n, name=f"name_{n}", job=["chef", "teacher"][n % 2]) for n in range(10)])
+    db.commit("test_table", partition_by=["job"])
+    db.register(table="test_table")
+
+    result = db.explain("select * from test_table where job = 'chef' and id >= 2")
+    assert result["tables"]["test_table"]["files_selected"] == 1
+    assert result["tables"]["test_table"]["files_total"] == 2
+
+    result = db.sql("select * from test_table where job = 'chef' and id >= 2", dtype="polars")
+    assert set(result["id"].to_list()) == set([2, 4, 6, 8])
+
+    result = db.sql("select * from test_table where id > 100 or job = 'chef'", dtype="polars")
+    assert set(result["id"].to_list()) == set([0, 2, 4, 6, 8])
+
+    result = db.sql("select * from test_table where id = 0 or job = 'teacher' and id > 100", dtype="polars")
+    assert result["id"].to_list() == [0]
+
+    result = db.sql("select * from test_table", dtype="polars")
+    assert result.shape == (10, 3)
+
+def test_sql_pruning_fails_open(db):
+    from datetime import datetime, timezone
+
+    db.upsert(table="test_table", primary_key="id", data=DataFrame(dict(
+        id=[1, 2], ts=[datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 6, 1, tzinfo=timezone.utc)],
+    )))
+    db.commit("test_table")
+    db.register(table="test_table")
+
+    assert db.sql("select id from test_table where ts > '2024-03-01 00:00:00'", dtype="json") == [dict(id=2)]
+
+def test_memory_budget_spill(db, tmp_path):
+    db.config = delta_config()
+    db.config.memory_budget = 1024
+    db.config.spill_path = str(tmp_path)
+
+    db.upsert(table="small_table", primary_key="id", data=dict(id=1, name="a"))
+    assert db.memory["small_table"] > 0
+    assert len(list(tmp_path.iterdir())) == 0
+
+    db.upsert(table="test_table", primary_key="id", data=[dict(id=n, name=f"name_{n}") for n in range(1000)])
+    assert db.memory == {"small_table": 0, "test_table": 0}
+    assert len(list(tmp_path.iterdir())) == 2
+
+    db.upsert(table="test_table", primary_key="id", data=dict(id=1000, name="b"))
+    assert len(list(tmp_path.iterdir())) == 2
+
+    result = db.sql("select * from test_table", dtype="polars")
+    assert result.shape == (1001, 2)
+
+    db.delete(table="test_table", filter="id >= 10")
+    assert db.sql("select * from test_table", dtype="polars").shape == (10, 2)
+    assert db.sql("select * from small_table", dtype="json") == [dict(id=1, name="a")]
+    assert db.memory["test_table"] > 0
+    assert len(list(tmp_path.iterdir())) == 1
+
+def test_changes(db):
+    db.upsert(table="test_table", primary_key="id", data=[dict(id=1, name="a"), dict(id=2, name="b"), dict(id=3, name="c")])
+    db.commit("test_table")
+    db.upsert(table="test_table", primary_key="id", data=[dict(id=2, name="B"), dict(id=4, name="d")])
+    db.delete(table="test_table", filter="id = 3")
+    db.commit("test_table")
+
+    result = db.changes(table="test_table", from_version=0, primary_key="id", dtype="polars")
+    changes = {row["id"]: (row["name"], row["_change_type"]) for row in result.to_dicts()}
+    assert changes == {2: ("B", "update"), 3: ("c", "delete"), 4: ("d", "insert")}
+
+    result = db.changes(table="test_table", from_version=0, to_version=1, dtype="polars")
+    assert sorted(result["_change_type"].to_list()) == ["delete", "delete", "insert", "insert"]
+
+    assert db.changes(table="test_table", from_version=1, dtype="polars").is_empty()
+    assert isinstance(db.changes(table="test_table", from_version=1, to_version=0), ValueError)
+
+def test_changes_data_feed(db):
+    from deltalake import DeltaTable, write_deltalake
+    from pyarrow import table
+
+    table_path = "test.delta/default/test_table"
+    write_deltalake(table_path, table(dict(id=[1, 2, 3], name=["a", "b", "c"])), configuration={"delta.enableChangeDataFeed": "true"})
+    DeltaTable(table_path).merge(table(dict(id=[2, 4], name=["B", "d"])), "s.id = t.id", source_alias="s", target_alias="t") \
+        .when_matched_update_all().when_not_matched_insert_all().execute()
+    DeltaTable(table_path).delete("id = 3")
+
+    result = db.changes(table="test_table", from_version=0, primary_key="id", dtype="polars")
+    changes = {row["id"]: (row["name"], row["_change_type"]) for row in result.to_dicts()}
+    assert changes == {2: ("B", "update"), 3: ("c", "delete"), 4: ("d", "insert")}
+
+    result = db.changes(table="test_table", from_version=1, to_version=2, dtype="polars")
+    assert result.to_dicts() == [dict(id=3, name="c", _change_type="delete")]
+
+    result = db.changes(table="test_table", from_version=2, dtype="polars")
+    assert result.is_empty()
+    assert result.columns == ["id", "name", "_change_type"]
+
+def test_checkout_timestamp(db):
+    from datetime import datetime, timezone
+    from time import sleep
+
+    db.upsert(table="test_table", primary_key="id", data=dict(id=1, name="a"))
+    db.commit("test_table")
+    sleep(0.05)
+    timestamp = datetime.now(timezone.utc)
+    sleep(0.05)
+    db.upsert(table="test_table", primary_key="id", data=dict(id=2, name="b"))
+    db.commit("test_table")
+
+    err = db.checkout(table="test_table", version=timestamp)
+    assert not err, err
+    assert db.sql("select * from test_table", dtype="json") == [dict(id=1, name="a")]
+
+    err = db.checkout(table="test_table", version=timestamp.isoformat())
+    assert not err, err
+    assert db.sql("select * from test_table", dtype="json") == [dict(id=1, name="a")]
+
+def test_snapshot_cache(db):
+    db.config = delta_config()
+    db.config.snapshot_cache_size = 1
+    db.config.snapshot_materialize_rows = 10
+    db._delta__delta_snapshots.clear()
+
+    db.upsert(table="test_table", primary_key="id", data=dict(id=1, name="a"))
+    db.commit("test_table")
+    db.upsert(table="test_table", primary_key="id", data=dict(id=2, name="b"))
+    db.commit("test_table")
+
+    db.checkout(table="test_table", version=0)
+    db.checkout(table="test_table", version=1)
+    assert len(db._delta__delta_snapshots) == 1
+    assert db._delta__delta_snapshots.get("test.delta/default/test_table", 1).data is not None
+    assert db.memory["test_table"] > 0
+    assert db.sql("select count(*) as n from test_table", dtype="json") == [dict(n=2)]
+
+    db.checkout(table="test_table", version=0)
+    assert db.sql("select * from test_table", dtype="json") == [dict(id=1, name="a")]
+
+def test_snapshot_without_stats(db):
+    from glob import glob
+    from json import dumps, loads
+
+    db.config = delta_config()
+    db._delta__delta_snapshots.clear()
+    db.upsert(table="test_table", primary_key="id", data=dict(id=1, name="a"))
+    db.commit("test_table")
+
+    for path in glob("test.delta/default/test_table/_delta_log/*.json"):
+        with open(path) as file: actions = [loads(line) for line in file if line.strip()]
+        for action in actions: action.get("add", {}).pop("stats", None)
+        with open(path, "w") as file: file.write("\n".join(dumps(action) for action in actions) + "\n")
+
+    err = db.checkout(table="test_table", version=0)
+    assert not err, err
+    assert db.sql("select * from test_table", dtype="json") == [dict(id=1, name="a")]
+
+    db.config.snapshot_materialize_rows = 10
+    err = db.checkout(table="test_table", version=0)
+    assert not err, err
+    assert db.sql("select * from test_table", dtype="json") == [dict(id=1, name="a")]
+    assert db._delta__delta_snapshots.get("test.delta/default/test_table", 0).data is None
+
+def test_upsert_bulk_inputs(db, tmp_path):
+    from pyarrow import table as arrow_table
+
+    db.upsert(table="test_table", primary_key="id", data=[dict(id=1, name="a")])
+    db.upsert(table="test_table", primary_key="id", data=dict(id=[2, 3], name=["b", "c"]))
+    db.upsert(table="test_table", primary_key="id", data=arrow_table({"id": [4], "name": ["d"]}))
+    db.upsert(table="test_table", primary_key="id", data=iter(arrow_table({"id": [5], "name": ["e"]}).to_batches()))
+
+    DataFrame([dict(id=6, name="f")]).write_parquet(tmp_path / "batch.parquet")
+    db.upsert(table="test_table", primary_key="id", data=str(tmp_path / "batch.parquet"))
+
+    (tmp_path / "batch.ndjson").write_text('{"id": 1, "name": "A"}\n{"id": 7, "name": "g"}\n')
+    db.upsert(table="test_table", primary_key="id", data=tmp_path / "batch.ndjson")
+
+    result = db.sql("select * from test_table order by id", dtype="polars")
+    assert result["id"].to_list() == [1, 2, 3, 4, 5, 6, 7]
+    assert result["name"].to_list() == ["A", "b", "c", "d", "e", "f", "g"]
+
+    err = db.upsert(table="test_table", primary_key="id", data=str(tmp_path / "batch.csv"))
+    assert isinstance(err, ValueError)
+
+def test_upsert_uses_table_schema(db):
+    from polars import Int32
+
+    db.register(table="test_table", data=DataFrame({"id": [1], "score": [1.5]}, schema_overrides={"id": Int32}))
+    db.upsert(table="test_table", primary_key="id", data=[dict(id=2, score=None), dict(id=3, score=2)])
+    assert db.schema("test_table") == {"id": int, "score": float}
+    assert db.sql("select * from test_table", dtype="polars").schema["id"] == Int32
+
+def test_materialized_view(db):
+    db.upsert(table="test_table", primary_key="id", data=[dict(id=1, job="a", dept="x", pay=10), dict(id=2, job="b", dept="x", pay=20), dict(id=3, job="a", dept="y", pay=30)])
+
+    views = {
+        "totals": "select job, sum(pay) as total, count(*) as people from test_table group by job",
+        "highest": "select job, max(pay) as top from test_table group by job",
+        "paid": "select id, pay from test_table where pay > 15",
+        "average": "select job, avg(pay) as pay from test_table group by job",
+        "overall": "select sum(pay) as total from test_table group by job",
+        "nested": "select job, sum(pay) as total from test_table group by job, dept",
+    }
+    for name, query in views.items():
+        err = db.create_materialized_view(name, query)
+        assert not err, err
+    assert {name: view.kind for name, view in db._delta__delta_views.items()} == dict(totals="aggregate", highest="aggregate", paid="rows", average="recompute", overall="recompute", nested="recompute")
+
+    def assert_views():
+        for name, query in views.items():
+            view = db.sql(f"select * from {name}", dtype="polars")
+            assert view.sort(view.columns).equals(db.sql(query, dtype="polars").sort(view.columns)), name
+
+    db.upsert(table="test_table", primary_key="id", data=[dict(id=1, job="b", dept="y", pay=5), dict(id=4, job="c", dept="x", pay=40)])
+    assert_views()
+    db.delete(table="test_table", filter="job = 'c'")
+    assert_views()
+    assert db.sql("select job from totals order by job", dtype="json") == [dict(job="a"), dict(job="b")]
+
+    err = db.create_materialized_view("test_table", "select * from test_table")
+    assert isinstance(err, ValueError)
+
+    err = db.drop_materialized_view("totals")
+    assert not err, err
+    assert "totals" not in db.tables
+
+def test_materialized_view_dependencies(db):
+    db.upsert(table="test_table", primary_key="id", data=[dict(id=1, pay=10), dict(id=2, pay=20)])
+
+    views = {
+        "total": "select sum(pay) as total from test_table",
+        "summary": "select count(*) as n, sum(pay) as total from test_table",
+    }
+    for name, query in views.items():
+        err = db.create_materialized_view(name, query)
+        assert not err, err
+    assert db._delta__delta_views["summary"].tables == {"test_table"}
+
+    db.upsert(table="test_table", primary_key="id", data=dict(id=3, pay=30))
+    for name, query in views.items():
+        assert db.sql(f"select * from {name}", dtype="json") == db.sql(query, dtype="json"), name
+
+def test_materialized_view_committed_source(db, monkeypatch):
+    db.upsert(table="test_table", primary_key="id", data=[dict(id=1, pay=10), dict(id=2, pay=20), dict(id=3, pay=30)])
+    db.commit("test_table")
+    db.register(table="test_table")
+    db.delete(table="test_table", filter="id = 3")
+
+    query = "select count(*) as n, sum(pay) as s from test_table"
+    err = db.create_materialized_view("totals", query)
+    assert not err, err
+
+    refreshed = []
+    refresh = delta._delta__refresh_view
+    monkeypatch.setattr(delta, "_delta__refresh_view", lambda self, view: refreshed.append(view.name) or refresh(self, view))
+
+    db.upsert(table="test_table", primary_key="id", data=dict(id=4, pay=40))
+    assert db.sql("select * from totals", dtype="json") == db.sql(query, dtype="json")
+    assert refreshed == []
+
+def test_materialized_view_persist(db):
+    db.upsert(table="test_table", primary_key="id", data=[dict(id=1, job="a"), dict(id=2, job="a")])
+    err = db.create_materialized_view("jobs", "select job, count(*) as people from test_table group by job", persist=True)
+    assert not err, err
+
+    db.upsert(table="test_table", primary_key="id", data=dict(id=3, job="b"))
+    db.register(table="jobs", alias="committed_jobs")
+    assert db.sql("select * from committed_jobs order by job", dtype="json") == [dict(job="a", people=2), dict(job="b", people=1)]
+
+def test_server(db, tmp_path):
+    from deltabase import delta_client
+    from pyarrow import Table
+
+    db.upsert(table="test_table", primary_key="id", data=[dict(id=1, name="a"), dict(id=2, name="b")])
+    server = db.serve(str(tmp_path / "delta.sock"), block=False)
+    try:
+        with delta_client(str(tmp_path / "delta.sock")) as client:
+            assert client.tables == ["test_table"]
+            assert client.sql("select * from test_table order by id") == [dict(id=1, name="a"), dict(id=2, name="b")]
+            assert isinstance(client.sql("select * from test_table", dtype="arrow"), Table)
+            assert client.sql("select count(*) as n from test_table", dtype="polars")["n"].to_list() == [2]
+            with pytest.raises(RuntimeError): client.sql("select * from missing_table")
+            assert client.sql("select id from test_table where id = 2") == [dict(id=2)]
+    finally: server.stop()
+    assert not (tmp_path / "delta.sock").exists()
+
+def test_server_existing_file(db, tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("notes")
+
+    with pytest.raises(FileExistsError): db.serve(str(path), block=False)
+    assert path.read_text() == "notes"
+
+def test_server_unsupported(db, monkeypatch):
+    import deltabase
+
+    monkeypatch.setattr(deltabase, "delta_server", None)
+    with pytest.raises(NotImplementedError): db.serve("delta.sock")